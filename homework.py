@@ -1,16 +1,34 @@
+import functools
 import logging
 import os
+import queue
+import random
+import signal
+import sys
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from http import HTTPStatus
+from logging.handlers import (QueueHandler, QueueListener,
+                              RotatingFileHandler)
 from pathlib import Path
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple, TypedDict, cast
 
 import requests
 import telegram
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from telegram.utils.request import Request
 from exceptions import (RequestExceptionError, SendmessageError,
                         TheAnswerIsNot200Error, TokenError)
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads  # type: ignore[assignment]
+
 load_dotenv()
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
@@ -19,25 +37,111 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 
 
 RETRY_PERIOD = 600  # 10 минут * 60 секунд
+RETRY_BASE_DELAY = 5  # базовая задержка повтора после сбоя, в секундах
+RETRY_MAX_FAILURES = 6  # ограничение показателя экспоненты задержки
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) в секундах
+TELEGRAM_POOL_SIZE = 4
+TELEGRAM_TIMEOUT = (5, 10)  # (connect, read) в секундах
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
-HOMEWORK_VERDICTS = {
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+shutdown_event = threading.Event()
+EXEC = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tg-send')
+
+
+@dataclass(frozen=True)
+class Config:
+    """Настройки бота, проверенные при запуске."""
+
+    practicum_token: str
+    telegram_token: str
+    chat_id: str
+
+
+class Homework(TypedDict, total=False):
+    """Домашняя работа в ответе API."""
+
+    id: int
+    homework_name: str
+    status: str
+    reviewer_comment: str
+    date_updated: str
+    lesson_name: str
+
+
+class ApiResponse(TypedDict):
+    """Ответ API Практикум.Домашки."""
+
+    current_date: int
+    homeworks: List[Homework]
+
+
+MESSAGE_TEMPLATE = 'Изменился статус проверки работы "{name}": {verdict}'
+
+HOMEWORK_VERDICTS = MappingProxyType({
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.',
-}
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename=Path('../program.log').resolve(),
-    filemode='w',
-    format='%(asctime)s - %(funcName)s - %(levelname)s - %(message)s',
-)
+})
+
+LOG_FORMAT = '%(asctime)s - %(funcName)s - %(levelname)s - %(message)s'
+LOG_PATH = Path(__file__).resolve().parent.parent / 'program.log'
+LOG_MAX_BYTES = 10_000_000
+LOG_BACKUP_COUNT = 3
+
 logger = logging.getLogger(__name__)
 
 
-def check_tokens() -> bool:
+@functools.lru_cache(maxsize=1)
+def _headers(practicum_token: str) -> Dict[str, str]:
+    """Заголовки запроса к API с токеном авторизации.
+
+    Собираются один раз для каждого нового значения токена.
+    """
+    return {'Authorization': f'OAuth {practicum_token}'}
+
+
+def setup_logging() -> QueueListener:
+    """Настраиваем журнал и запускаем слушателя очереди логов.
+
+    Корневой логгер складывает записи (в том числе записи библиотек
+    urllib3 и python-telegram-bot) в очередь, а в файл и консоль их
+    пишет фоновый поток слушателя, не задерживая основной цикл.
+
+    Возвращает:
+        Запущенный QueueListener, который нужно остановить при выходе.
+    """
+    log_queue: queue.Queue = queue.Queue(-1)
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = RotatingFileHandler(
+        LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG)
+    root_logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, file_handler, stream_handler)
+    listener.start()
+    return listener
+
+
+def _log_send_failure(future: Future) -> None:
+    """Логируем исключение фоновой отправки сообщения, если оно было."""
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error(
+            'Фоновая отправка сообщения не удалась: %s', error,
+            exc_info=error,
+        )
+
+
+def check_tokens() -> Config:
     """Проверяем наличия токена.
 
     Доступны ли токены, которые необходимы для работы программы.
@@ -45,21 +149,31 @@ def check_tokens() -> bool:
     свою работу.
 
     Возвращает:
-        True если проверка пройдена или TokenError, если что-то отсутсвует.
+        Config с проверенными токенами или TokenError, если что-то
+        отсутсвует.
     """
-    list_tokens = []
-    for name in ['PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID']:
-        if globals().get(name) is None:
-            list_tokens.append(name)
-    if not list_tokens:
-        return True
-    else:
-        api_answer = 'Отстутствует одна или несколько переменных окружения'
-        logging.critical(api_answer)
-        raise TokenError
-
-
-def send_message(bot: telegram.bot.Bot, message: str) -> None:
+    if PRACTICUM_TOKEN and TELEGRAM_TOKEN and TELEGRAM_CHAT_ID:
+        return Config(
+            practicum_token=PRACTICUM_TOKEN,
+            telegram_token=TELEGRAM_TOKEN,
+            chat_id=TELEGRAM_CHAT_ID,
+        )
+    missing = [
+        name for name, value in (
+            ('PRACTICUM_TOKEN', PRACTICUM_TOKEN),
+            ('TELEGRAM_TOKEN', TELEGRAM_TOKEN),
+            ('TELEGRAM_CHAT_ID', TELEGRAM_CHAT_ID),
+        ) if not value
+    ]
+    logger.critical(
+        'Отсутствуют переменные окружения: %s', ', '.join(missing),
+    )
+    raise TokenError(', '.join(missing))
+
+
+def send_message(
+    bot: telegram.bot.Bot, message: str, config: Config,
+) -> None:
     """Отправляем сообщение в Телеграм.
 
     В случае успеха пользователь получает сообщение в чат Телеграма.
@@ -68,52 +182,56 @@ def send_message(bot: telegram.bot.Bot, message: str) -> None:
     Параметры:
         bot: экземпляр класса Bot.
         message: строка сообщения с текстом.
+        config: настройки бота с идентификатором чата.
     """
-    logger.info(
-        f'Вызываем функцию send_message c аргументами {bot} и {message}',
-    )
+    logger.info('Вызываем функцию send_message c сообщением %s', message)
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        bot.send_message(config.chat_id, message)
     except telegram.error.TelegramError as telegram_error:
-        logging.exception(
-            f'Сообщение в Telegram не отправлено: {telegram_error}',
+        logger.exception(
+            'Сообщение в Telegram не отправлено: %s', telegram_error,
         )
         raise SendmessageError
-    logger.debug(f'Сообщение в Telegram отправлено: {message}')
+    logger.debug('Сообщение в Telegram отправлено: %s', message)
 
 
-def get_api_answer(timestamp: int) -> Dict[str, List[str]]:
+def get_api_answer(timestamp: int, config: Config) -> ApiResponse:
     """Получение данных с API Яндекс Практикума.
 
     Делает запрос к единственному эндпойнту на предмет доступности.
 
     Параметры:
         timestamp: временная метка запроса.
+        config: настройки бота с токеном Практикума.
 
     Возвращает:
         В случае успешного запроса возвращает ответ API в формате JSON.
         В случае неудачи выводится ошибка и осуществляется запись в лог.
     """
-    logger.info(f'Вызываем функцию get_api_answer c аргументами {timestamp}')
+    logger.info('Вызываем функцию get_api_answer c аргументами %s', timestamp)
     try:
-        response = requests.get(
+        with SESSION.get(
             ENDPOINT,
-            headers=HEADERS,
+            headers=_headers(config.practicum_token),
             params={'from_date': timestamp},
-        )
+            timeout=REQUEST_TIMEOUT,
+        ) as response:
+            status_code = response.status_code
+            content = response.content
     except requests.exceptions.RequestException as request_error:
-        logger.error(f'Код ответа API : {request_error}')
+        logger.error('Код ответа API : %s', request_error)
         raise RequestExceptionError
-    if response.status_code != HTTPStatus.OK:
+    if status_code != HTTPStatus.OK:
         logger.error(
-            f'Эндпоинт {ENDPOINT} недоступен.'
-            f' Код ответа API: {response.status_code}',
+            'Эндпоинт %s недоступен. Код ответа API: %s',
+            ENDPOINT,
+            status_code,
         )
         raise TheAnswerIsNot200Error
-    return response.json()
+    return cast(ApiResponse, json_loads(content))
 
 
-def check_response(response: Dict[str, List[str]]) -> List[str]:
+def check_response(response: ApiResponse) -> List[Homework]:
     """Проверяем данные в response.
 
     Соответствует ли ответ API документации.
@@ -127,18 +245,23 @@ def check_response(response: Dict[str, List[str]]) -> List[str]:
         В случае неудачи обработки запроса выводится ошибка с просьбой
         проверить переменные окружения.
     """
-    logger.info(f'Вызываем функцию check_response c аргументами {response}')
-    if isinstance(response, dict) and all(
-        key for key in ('current_date', 'homeworks')
-    ) and isinstance(response.get('homeworks'), list):
-        return response.get('homeworks')
-
-    raise TypeError(
-        'Ошибка API при проверке response, проверьте данные.',
-    )
+    logger.info('Вызываем функцию check_response c аргументами %s', response)
+    if not isinstance(response, dict):
+        raise TypeError(
+            'Ошибка API при проверке response: ожидался словарь.',
+        )
+    for key in ('current_date', 'homeworks'):
+        if key not in response:
+            raise KeyError(f'В ответе API отсутствует ключ {key}.')
+    homeworks = response['homeworks']
+    if not isinstance(homeworks, list):
+        raise TypeError(
+            'Ошибка API при проверке response: homeworks не является списком.',
+        )
+    return homeworks
 
 
-def parse_status(homework: Dict[str, str]) -> str:
+def parse_status(homework: Homework) -> str:
     """Анализируем статус если изменился.
 
     Извлекает статус о конкретной домашней работе.
@@ -154,59 +277,101 @@ def parse_status(homework: Dict[str, str]) -> str:
         зависимости от причины сбоя - соответствие значений
         по указываему ключу или если статуса нет в словаре вердиктов.
     """
-    logger.info(f'Вызываем функцию parse_status c аргументами {homework}')
+    logger.info('Вызываем функцию parse_status c аргументами %s', homework)
     try:
         name, status = homework['homework_name'], homework['status']
     except KeyError:
         raise KeyError(
             'Ошибка ключа при запросе названия и статуса домашней работы',
         )
-    try:
-        verdict = HOMEWORK_VERDICTS[status]
-    except KeyError:
-        raise KeyError(
-            f'Ошибка ключа при запросе статуса работы: {verdict}',
-        )
-    return f'Изменился статус проверки работы "{name}": {verdict}'
+    verdict = HOMEWORK_VERDICTS.get(status)
+    if verdict is None:
+        raise ValueError(f'Неизвестный статус работы: {status}')
+    return MESSAGE_TEMPLATE.format(name=name, verdict=verdict)
 
 
 def main() -> None:
     """Основная логика работы бота.
 
-    Делаем проверку токенов функцией check_tokens().
+    Делаем проверку токенов функцией check_tokens() и получаем
+    из неё настройки Config.
     Запускаем бота.
     Делаем запрос к API функцией get_api_answer().
     Проверяем ответ функцией check_response().
     Если есть обновления получаем статус обновления
     функцией parse_status() и отправляем сообщение с уведомлением
-    в Telegram функцией send_message().
-    Далее уходим в режим ожидания на время RETRY_PERIOD и
-    возвращаемся к началу работы.
+    в Telegram функцией send_message(), если статус отличается
+    от последнего отправленного.
+    Далее уходим в режим ожидания до истечения RETRY_PERIOD с начала
+    итерации и возвращаемся к началу работы. Ожидание прерывается
+    сигналом SIGTERM, после чего бот завершает работу.
 
     В случае сбоя в работе выводим в Telegram уведомление
-    с названием ошибки и логируем это в журнал.
+    с названием ошибки и логируем это в журнал. Одну и ту же ошибку
+    повторно не отправляем, а отправка идёт в фоновом потоке EXEC
+    и не задерживает цикл. Повторный запрос после сбоя делаем через
+    случайную задержку, верхняя граница которой растёт экспоненциально
+    с числом сбоев подряд, но не превышает RETRY_PERIOD.
     """
-    logging.info('Бот запущен.')
-    check_tokens()
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    logger.info('Бот запущен.')
+    try:
+        config = check_tokens()
+    except TokenError as token_error:
+        sys.exit(f'Программа остановлена, нет токенов: {token_error}')
+    connect_timeout, read_timeout = TELEGRAM_TIMEOUT
+    request = Request(
+        con_pool_size=TELEGRAM_POOL_SIZE,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+    )
+    bot = telegram.Bot(token=config.telegram_token, request=request)
+    signal.signal(signal.SIGTERM, lambda *_: shutdown_event.set())
     timestamp = int(time.time())
-    while True:
+    failures = 0
+    last_error_message: Optional[str] = None
+    last_status: Optional[Tuple[Optional[str], Optional[str]]] = None
+    while not shutdown_event.is_set():
+        started = time.monotonic()
         try:
-            response = get_api_answer(timestamp)
+            response = get_api_answer(timestamp, config)
             homeworks = check_response(response)
             logger.info('Cписок работ получен.')
             if homeworks:
-                send_message(bot, parse_status(homeworks[0]))
+                homework = homeworks[0]
+                status = (
+                    homework.get('homework_name'), homework.get('status'),
+                )
+                if status != last_status:
+                    send_message(bot, parse_status(homework), config)
+                    last_status = status
+                else:
+                    logger.debug('Статус работы не изменился.')
                 timestamp = response['current_date']
             else:
                 logger.info('Новых заданий нет.')
         except Exception as error:
             message = f'Сбой в работе программы: {error}'
-            send_message(bot, message)
+            if message != last_error_message:
+                future = EXEC.submit(send_message, bot, message, config)
+                future.add_done_callback(_log_send_failure)
+                last_error_message = message
             logger.critical(message)
-        finally:
-            time.sleep(RETRY_PERIOD)
+            delay = min(RETRY_PERIOD, RETRY_BASE_DELAY * 2 ** failures)
+            failures = min(failures + 1, RETRY_MAX_FAILURES)
+            wait_for = random.uniform(0, delay)
+        else:
+            failures = 0
+            last_error_message = None
+            elapsed = time.monotonic() - started
+            wait_for = max(0, RETRY_PERIOD - elapsed)
+        shutdown_event.wait(wait_for)
+    logger.info('Бот остановлен.')
 
 
 if __name__ == '__main__':
-    main()
+    log_listener = setup_logging()
+    try:
+        main()
+    finally:
+        EXEC.shutdown(wait=True)
+        log_listener.stop()
@@ -23,6 +23,15 @@ def homework_module():
     return homework
 
 
+@pytest.fixture
+def config(homework_module):
+    return homework_module.Config(
+        practicum_token='sometoken',
+        telegram_token='1234:abcdefg',
+        chat_id='12345',
+    )
+
+
 @pytest.fixture
 def random_message():
     def random_string(string_length=15):
@@ -1,6 +1,10 @@
 import inspect
 import logging
+import os
+import random
 import re
+import signal
+import threading
 import time
 from http import HTTPStatus
 
@@ -44,10 +48,10 @@ class TestHomework:
     ENV_VARS = ['PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID']
     HOMEWORK_CONSTANTS = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN',
                           'TELEGRAM_CHAT_ID', 'RETRY_PERIOD',
-                          'ENDPOINT', 'HEADERS', 'HOMEWORK_VERDICTS')
+                          'ENDPOINT', 'HOMEWORK_VERDICTS')
     HOMEWORK_FUNC_WITH_PARAMS_QTY = {
-        'send_message': 2,
-        'get_api_answer': 1,
+        'send_message': 3,
+        'get_api_answer': 2,
         'check_response': 1,
         'parse_status': 1,
         'check_tokens': 0,
@@ -61,6 +65,12 @@ class TestHomework:
             },
             'homeworks'
         ),
+        'no_current_date_key': utils.InvalidResponse(
+            {
+                'homeworks': []
+            },
+            'current_date'
+        ),
         'not_dict_response': utils.InvalidResponse(
             [{
                 'homeworks': [
@@ -147,7 +157,7 @@ class TestHomework:
         )
 
     def test_request_get_call(self, monkeypatch, current_timestamp,
-                              homework_module):
+                              config, homework_module):
         func_name = 'get_api_answer'
         utils.check_function(
             homework_module,
@@ -164,14 +174,15 @@ class TestHomework:
             assert url.startswith(expected_url), (
                 'Проверьте адрес, на который отправляются запросы.'
             )
-            assert 'headers' in kwargs, (
-                'Проверьте, что в запрос к API передан заголовок.'
-            )
-            assert 'Authorization' in kwargs['headers'], (
+            headers = {
+                **homework_module.SESSION.headers,
+                **kwargs.get('headers', {}),
+            }
+            assert 'Authorization' in headers, (
                 'Проверьте, что в заголовках запроса передано поле '
                 '`Authorization`.'
             )
-            assert kwargs['headers']['Authorization'].startswith('OAuth '), (
+            assert headers['Authorization'].startswith('OAuth '), (
                 'Проверьте, что заголовок `Authorization` начинается с `OAuth`.'
             )
             assert 'params' in kwargs, (
@@ -191,16 +202,16 @@ class TestHomework:
                     'Проверьте, что в параметре `from_date` передано число.'
                 )
 
-        monkeypatch.setattr(requests, 'get', check_request_get_call)
+        monkeypatch.setattr(homework_module.SESSION, 'get', check_request_get_call)
         try:
-            homework_module.get_api_answer(current_timestamp)
+            homework_module.get_api_answer(current_timestamp, config)
         except AssertionError as e:
             raise ArithmeticError(str(e))
         except Exception:
             pass
 
     def test_get_api_answers(self, monkeypatch, random_timestamp,
-                             current_timestamp, homework_module):
+                             current_timestamp, config, homework_module):
         func_name = 'get_api_answer'
         utils.check_function(
             homework_module,
@@ -214,9 +225,9 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(homework_module.SESSION, 'get', mock_response_get)
 
-        result = homework_module.get_api_answer(current_timestamp)
+        result = homework_module.get_api_answer(current_timestamp, config)
         assert isinstance(result, dict), (
             f'Проверьте, что функция `{func_name}` возвращает словарь.'
         )
@@ -226,6 +237,7 @@ class TestHomework:
                                          monkeypatch,
                                          current_timestamp,
                                          response,
+                                         config,
                                          homework_module):
         func_name = 'get_api_answer'
         utils.check_function(
@@ -234,9 +246,9 @@ class TestHomework:
             self.HOMEWORK_FUNC_WITH_PARAMS_QTY[func_name]
         )
 
-        monkeypatch.setattr(requests, 'get', response)
+        monkeypatch.setattr(homework_module.SESSION, 'get', response)
         try:
-            homework_module.get_api_answer(current_timestamp)
+            homework_module.get_api_answer(current_timestamp, config)
         except Exception:
             pass
         else:
@@ -247,6 +259,7 @@ class TestHomework:
 
     def test_get_api_answer_with_request_exception(self, current_timestamp,
                                                    monkeypatch,
+                                                   config,
                                                    homework_module):
         func_name = 'get_api_answer'
         utils.check_function(
@@ -258,9 +271,9 @@ class TestHomework:
         def mock_request_get_with_exception(*args, **kwargs):
             raise requests.RequestException('Something wrong')
 
-        monkeypatch.setattr(requests, 'get', mock_request_get_with_exception)
+        monkeypatch.setattr(homework_module.SESSION, 'get', mock_request_get_with_exception)
         try:
-            homework_module.get_api_answer(current_timestamp)
+            homework_module.get_api_answer(current_timestamp, config)
         except requests.RequestException:
             raise AssertionError(
                 f'Убедитесь, что в функции `{func_name}` обрабатывается '
@@ -448,7 +461,7 @@ class TestHomework:
                 raise AssertionError(assert_message)
 
     def test_send_message(self, monkeypatch, random_message,
-                          caplog, homework_module):
+                          caplog, config, homework_module):
         homework_module.PRACTICUM_TOKEN = 'sometoken'
         homework_module.TELEGRAM_TOKEN = '1234:abcdefg'
         homework_module.TELEGRAM_CHAT_ID = '12345'
@@ -466,7 +479,7 @@ class TestHomework:
                 'Убедитесь, что при успешной отправке сообщения в Telegram '
                 'событие логируется с уровнем `DEBUG`.'
         )):
-            homework_module.send_message(bot, 'Test_message_check')
+            homework_module.send_message(bot, 'Test_message_check', config)
             assert bot.chat_id, (
                 'Проверьте, что при отправке сообщения бота передан параметр `chat_id`.'
             )
@@ -479,7 +492,8 @@ class TestHomework:
             )
 
     def test_send_message_with_tg_error(self, monkeypatch, caplog,
-                                        random_message, homework_module):
+                                        random_message, config,
+                                        homework_module):
         func_name = 'send_message'
         utils.check_function(
             homework_module,
@@ -499,7 +513,7 @@ class TestHomework:
             'логируется с уровнем `ERROR`.'
         )):
             try:
-                homework_module.send_message(bot, 'Test_message_check')
+                homework_module.send_message(bot, 'Test_message_check', config)
             except telegram.error.TelegramError:
                 raise AssertionError(
                     f'Убедитесь, что в функции `{func_name}` обрабатывается '
@@ -518,7 +532,7 @@ class TestHomework:
 
         main_source = inspect.getsource(homework_module.main)
         bot_init_pattern = re.compile(
-            r'(\# *)?(\w* ?= ?)(telegram\.Bot\( *[\w=_\-\'\"]* *\))'
+            r'(\# *)?(\w* ?= ?)(telegram\.Bot\( *[\w=_\-\'\"., ]* *\))'
         )
         search_result = re.search(bot_init_pattern, main_source)
         is_commented = search_result[1] is None if search_result else False
@@ -527,11 +541,11 @@ class TestHomework:
         )
 
         bot_init_with_token_pattern = re.compile(
-            r'telegram\.Bot\( *token *= *TELEGRAM_TOKEN *\)'
+            r'telegram\.Bot\( *token *= *config\.telegram_token *[,)]'
         )
         assert re.search(bot_init_with_token_pattern, main_source), (
             'Убедитесь, что при создании бота в него передан токен: '
-            '`token=TELEGRAM_TOKEN`.'
+            '`token=config.telegram_token`.'
         )
 
     def mock_main(self, monkeypatch, random_message, random_timestamp,
@@ -548,23 +562,28 @@ class TestHomework:
         )
 
         main_source = inspect.getsource(homework_module.main)
-        time_sleep_pattern = re.compile(
-            r'(\# *)?(time\.sleep\( *[\w\d=_\-\'\"]* *\))'
+        wait_pattern = re.compile(
+            r'(\# *)?(shutdown_event\.wait\( *[\w\d=_\-\'\"]* *\))'
         )
-        search_result = re.search(time_sleep_pattern, main_source)
+        search_result = re.search(wait_pattern, main_source)
         is_commented = search_result[1] is None if search_result else False
         assert search_result and is_commented, (
-            'Убедитесь, что в `main()` применена функция `time.sleep()`.'
+            'Убедитесь, что в `main()` применён метод '
+            '`shutdown_event.wait()`.'
         )
 
         def sleep_to_interrupt(secs):
             assert secs == self.RETRY_PERIOD, (
                 'Убедитесь, что повторный запрос к API домашки отправляется '
-                'через 10 минут: `time.sleep(RETRY_PERIOD)`.'
+                'через 10 минут: `RETRY_PERIOD`.'
             )
             raise utils.BreakInfiniteLoop('break')
 
-        monkeypatch.setattr(time, 'sleep', sleep_to_interrupt)
+        monkeypatch.setattr(time, 'monotonic', lambda: 0.0)
+
+        monkeypatch.setattr(
+            homework_module.shutdown_event, 'wait', sleep_to_interrupt
+        )
 
         def mock_telegram_bot(random_message=random_message, *args, **kwargs):
             return utils.MockTelegramBot(*args,
@@ -586,7 +605,7 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(homework_module.SESSION, 'get', mock_response_get)
 
     def test_main_without_env_vars_raise_exception(
             self, caplog, monkeypatch, random_timestamp, current_timestamp,
@@ -640,7 +659,7 @@ class TestHomework:
                     if record.message == utils.MockResponseGET.CALLED_LOG_MSG
                 ]
                 assert log_record, (
-                    'Убедитесь, что бот использует функцию `requests.get()` '
+                    'Убедитесь, что бот использует метод `SESSION.get()` '
                     'для отправки запроса к API домашки.'
                 )
 
@@ -723,14 +742,14 @@ class TestHomework:
                 data=data_with_new_hw_status
             ))
         monkeypatch.setattr(
-            requests,
+            homework_module.SESSION,
             'get',
             mock_response_get_with_new_status
         )
 
         hw_status = data_with_new_hw_status['homeworks'][0]['status']
 
-        def mock_send_message(bot, message=''):
+        def mock_send_message(bot, message='', config=None):
             logging.warn(message)
 
         monkeypatch.setattr(
@@ -752,6 +771,269 @@ class TestHomework:
                     'из переменной `HOMEWORK_VERDICTS`.'
                 )
 
+    def run_main(self, monkeypatch, homework_module, results, on_wait=None,
+                 failing_sends=0):
+        """
+        Run main() over the given poll results.
+
+        Each item of `results` is either an API response returned by
+        get_api_answer() or an exception raised from it; main() stops after
+        the last one. `on_wait` is called with the shutdown event on every
+        wait, and the first `failing_sends` sends raise SendmessageError.
+        Return the waits between polls and the successfully sent messages.
+        """
+        homework_module.PRACTICUM_TOKEN = 'sometoken'
+        homework_module.TELEGRAM_TOKEN = '1234:abcdefg'
+        homework_module.TELEGRAM_CHAT_ID = '12345'
+        monkeypatch.setattr(telegram, 'Bot', utils.MockTelegramBot)
+        shutdown_event = threading.Event()
+        monkeypatch.setattr(homework_module, 'shutdown_event', shutdown_event)
+        pending = list(results)
+        waits, sent = [], []
+        failures_left = [failing_sends]
+
+        def mock_get_api_answer(timestamp, config):
+            result = pending.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        def mock_wait(secs):
+            waits.append(secs)
+            if on_wait is not None:
+                on_wait(shutdown_event)
+            if not pending:
+                shutdown_event.set()
+
+        def mock_send_message(bot, message, config):
+            if failures_left[0]:
+                failures_left[0] -= 1
+                raise homework_module.SendmessageError
+            sent.append(message)
+
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer', mock_get_api_answer
+        )
+        monkeypatch.setattr(shutdown_event, 'wait', mock_wait)
+        monkeypatch.setattr(homework_module, 'send_message', mock_send_message)
+        previous_handler = signal.getsignal(signal.SIGTERM)
+        try:
+            homework_module.main()
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+        homework_module.EXEC.submit(lambda: None).result()
+        return waits, sent
+
+    def test_main_backoff_within_bounds(self, monkeypatch, homework_module):
+        failures = 10
+        waits, _ = self.run_main(
+            monkeypatch,
+            homework_module,
+            [Exception('API down')] * failures
+        )
+        assert len(waits) == failures
+        for n, secs in enumerate(waits):
+            upper = min(
+                homework_module.RETRY_PERIOD,
+                homework_module.RETRY_BASE_DELAY
+                * 2 ** min(n, homework_module.RETRY_MAX_FAILURES)
+            )
+            assert 0 <= secs <= upper, (
+                'Убедитесь, что задержка после сбоя не превышает '
+                '`min(RETRY_PERIOD, RETRY_BASE_DELAY * 2 ** n)`.'
+            )
+
+    def test_main_backoff_is_capped_and_reset(self, monkeypatch,
+                                              random_timestamp,
+                                              homework_module):
+        monkeypatch.setattr(random, 'uniform', lambda low, high: high)
+        failures = homework_module.RETRY_MAX_FAILURES + 2
+        ok_response = {'homeworks': [], 'current_date': random_timestamp}
+        waits, _ = self.run_main(
+            monkeypatch,
+            homework_module,
+            [Exception('API down')] * failures
+            + [ok_response, Exception('API down')]
+        )
+        base = homework_module.RETRY_BASE_DELAY
+        capped = base * 2 ** homework_module.RETRY_MAX_FAILURES
+        expected = [
+            min(homework_module.RETRY_PERIOD, base * 2 ** n, capped)
+            for n in range(failures)
+        ]
+        assert waits[:failures] == expected, (
+            'Убедитесь, что показатель задержки после сбоев перестаёт расти '
+            'на `RETRY_MAX_FAILURES`.'
+        )
+        assert (
+            homework_module.RETRY_PERIOD - 1
+            < waits[failures]
+            <= homework_module.RETRY_PERIOD
+        ), 'Убедитесь, что после успешного запроса бот ждёт `RETRY_PERIOD`.'
+        assert waits[failures + 1] == base, (
+            'Убедитесь, что успешный запрос сбрасывает счётчик сбоев.'
+        )
+
+    def test_main_does_not_repeat_error_message(self, monkeypatch,
+                                                random_timestamp,
+                                                homework_module):
+        ok_response = {'homeworks': [], 'current_date': random_timestamp}
+        _, sent = self.run_main(
+            monkeypatch,
+            homework_module,
+            [
+                Exception('first'),
+                Exception('first'),
+                Exception('second'),
+                ok_response,
+                Exception('second'),
+            ]
+        )
+        assert sent == [
+            'Сбой в работе программы: first',
+            'Сбой в работе программы: second',
+            'Сбой в работе программы: second',
+        ], (
+            'Убедитесь, что одинаковая ошибка подряд отправляется в Telegram '
+            'один раз, а после успешного запроса отправляется снова.'
+        )
+
+    def test_main_waits_rest_of_retry_period(self, monkeypatch,
+                                             random_timestamp,
+                                             homework_module):
+        clock = iter([100.0, 130.0])
+        monkeypatch.setattr(time, 'monotonic', lambda: next(clock))
+        waits, _ = self.run_main(
+            monkeypatch,
+            homework_module,
+            [{'homeworks': [], 'current_date': random_timestamp}]
+        )
+        assert waits == [self.RETRY_PERIOD - 30], (
+            'Убедитесь, что после успешного запроса бот ждёт '
+            '`RETRY_PERIOD` за вычетом времени, ушедшего на итерацию.'
+        )
+
+    def test_main_stops_on_shutdown_event(self, monkeypatch,
+                                          random_timestamp,
+                                          homework_module):
+        ok_response = {'homeworks': [], 'current_date': random_timestamp}
+        waits, _ = self.run_main(
+            monkeypatch,
+            homework_module,
+            [ok_response] * 3,
+            on_wait=lambda event: event.set()
+        )
+        assert len(waits) == 1, (
+            'Убедитесь, что `main()` завершается, когда установлен '
+            '`shutdown_event`.'
+        )
+
+    def test_main_stops_on_sigterm(self, monkeypatch, random_timestamp,
+                                   homework_module):
+        ok_response = {'homeworks': [], 'current_date': random_timestamp}
+        waits, _ = self.run_main(
+            monkeypatch,
+            homework_module,
+            [ok_response] * 3,
+            on_wait=lambda event: os.kill(os.getpid(), signal.SIGTERM)
+        )
+        assert len(waits) == 1, (
+            'Убедитесь, что `main()` завершается по сигналу SIGTERM.'
+        )
+
+    def test_main_does_not_repeat_unchanged_status(self, monkeypatch,
+                                                   random_timestamp,
+                                                   homework_module):
+        response = {
+            'homeworks': [{'homework_name': 'hw123', 'status': 'approved'}],
+            'current_date': random_timestamp
+        }
+        _, sent = self.run_main(
+            monkeypatch, homework_module, [response, response]
+        )
+        assert len(sent) == 1, (
+            'Убедитесь, что неизменившийся статус работы не отправляется '
+            'в Telegram повторно.'
+        )
+
+    def test_main_retries_status_after_failed_send(self, monkeypatch,
+                                                   random_timestamp,
+                                                   homework_module):
+        response = {
+            'homeworks': [{'homework_name': 'hw123', 'status': 'approved'}],
+            'current_date': random_timestamp
+        }
+        _, sent = self.run_main(
+            monkeypatch,
+            homework_module,
+            [response] * 3,
+            failing_sends=1
+        )
+        status_messages = [
+            message for message in sent
+            if self.HOMEWORK_VERDICTS['approved'] in message
+        ]
+        assert len(status_messages) == 1, (
+            'Убедитесь, что после неудачной отправки статус работы '
+            'отправляется снова при следующем запросе, и только один раз.'
+        )
+
+    def test_main_sends_errors_in_background(self, monkeypatch,
+                                             random_timestamp,
+                                             homework_module):
+        submitted = []
+        executor = homework_module.EXEC
+
+        class SpyExecutor:
+            def submit(self, fn, *args):
+                submitted.append(args)
+                return executor.submit(fn, *args)
+
+        monkeypatch.setattr(homework_module, 'EXEC', SpyExecutor())
+        response = {
+            'homeworks': [{'homework_name': 'hw123', 'status': 'approved'}],
+            'current_date': random_timestamp
+        }
+        error_message = 'Сбой в работе программы: API down'
+        _, sent = self.run_main(
+            monkeypatch,
+            homework_module,
+            [Exception('API down'), response]
+        )
+        submitted_messages = [args[1] for args in submitted if len(args) > 1]
+        assert submitted_messages == [error_message], (
+            'Убедитесь, что сообщение об ошибке отправляется через `EXEC`.'
+        )
+        status_messages = [
+            message for message in sent
+            if self.HOMEWORK_VERDICTS['approved'] in message
+        ]
+        assert status_messages, (
+            'Убедитесь, что сообщение о статусе работы отправляется.'
+        )
+        assert not set(status_messages) & set(submitted_messages), (
+            'Убедитесь, что сообщение о статусе работы отправляется '
+            'синхронно, а не через `EXEC`.'
+        )
+
+    def test_main_logs_background_send_failure(self, monkeypatch, caplog,
+                                               homework_module):
+        with caplog.at_level(logging.ERROR):
+            self.run_main(
+                monkeypatch,
+                homework_module,
+                [Exception('API down')],
+                failing_sends=1
+            )
+        assert any(
+            record.exc_info
+            and isinstance(record.exc_info[1], homework_module.SendmessageError)
+            for record in caplog.records
+        ), (
+            'Убедитесь, что исключение фоновой отправки сообщения '
+            'логируется.'
+        )
+
     def test_docstrings(self, homework_module):
         for func in self.HOMEWORK_FUNC_WITH_PARAMS_QTY:
             utils.check_docstring(homework_module, func)
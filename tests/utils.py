@@ -1,3 +1,4 @@
+import json
 import logging
 from collections import namedtuple
 from contextlib import contextmanager
@@ -83,6 +84,16 @@ class MockResponseGET:
         self.text = ''
         logging.warn(MockResponseGET.CALLED_LOG_MSG)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def content(self):
+        return json.dumps(self.json()).encode()
+
     def json(self):
         data = {
             "homeworks": [],